@@ -37,6 +37,7 @@ Execute:
 """
 
 import os
+import sys
 import shutil
 import setuptools
 
@@ -52,12 +53,29 @@ TVB_INSTALL_REQUIREMENTS = ["allensdk", "BeautifulSoup4", "cfflib", "cherrypy",
 with open(os.path.join(os.path.dirname(__file__), 'README.rst')) as fd:
     DESCRIPTION = fd.read()
 
+# Optional compiled BFS for BCT adapters; parallel (OpenMP) only with GCC on Linux.
+# When it fails to build (no C compiler or OpenMP runtime), the install goes on and BCT adapters use SciPy.
+try:
+    from Cython.Build import cythonize
+
+    OPENMP_FLAGS = ['-fopenmp'] if sys.platform.startswith('linux') else []
+    EXT_MODULES = cythonize([setuptools.Extension("tvb.adapters.analyzers._bct_bfs",
+                                                  ["tvb/adapters/analyzers/_bct_bfs.pyx"],
+                                                  extra_compile_args=OPENMP_FLAGS, extra_link_args=OPENMP_FLAGS)])
+    # set after cythonize, which does not copy it to the extensions it returns
+    for extension in EXT_MODULES:
+        extension.optional = True
+except ImportError:
+    EXT_MODULES = []
+
 setuptools.setup(name="tvb-framework",
                  version=VERSION,
                  packages=setuptools.find_packages(),
+                 ext_modules=EXT_MODULES,
                  include_package_data=True,
                  install_requires=TVB_INSTALL_REQUIREMENTS,
-                 extras_require={'postgres': ["psycopg2"]},
+                 extras_require={'postgres': ["psycopg2"], 'numba': ["numba"],
+                                 'leiden': ["python-igraph", "leidenalg"]},
                  description='A package for performing whole brain simulations',
                  long_description=DESCRIPTION,
                  license="GPL v3",
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+# cython: boundscheck=False, wraparound=False
+
+"""
+Compiled breadth-first search used for BCT breadthdist.m, on a graph given in CSR format.
+Searches from the source nodes run in parallel (OpenMP), without holding the GIL.
+"""
+
+from cython.parallel import prange
+from libc.math cimport INFINITY
+from libc.stdlib cimport malloc, calloc, free
+
+
+cdef void _breadth(const int* indptr, const int* indices, int n, int source, float* distance) nogil:
+    """
+    Port of BCT breadth.m: fill `distance` with the number of steps from `source` to each node.
+    """
+    cdef int* queue = <int*> malloc(n * sizeof(int))
+    cdef char* discovered = <char*> calloc(n, sizeof(char))
+    cdef int head = 0, tail = 1, u, v, e
+
+    for v in range(n):
+        distance[v] = INFINITY
+    distance[source] = 0
+    discovered[source] = 1
+    queue[0] = source
+
+    while head < tail:
+        u = queue[head]
+        head = head + 1
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            # this allows the 'source' distance to itself to be recorded
+            if distance[v] == 0:
+                distance[v] = distance[u] + 1
+            if not discovered[v]:
+                discovered[v] = 1
+                distance[v] = distance[u] + 1
+                queue[tail] = v
+                tail = tail + 1
+
+    if distance[source] == 0:
+        distance[source] = INFINITY
+    free(queue)
+    free(discovered)
+
+
+def breadthdist(const int[::1] indptr, const int[::1] indices, float[:, ::1] D_out):
+    """
+    Fill D_out (n x n) with the breadth-first distances between all nodes of the CSR graph (indptr, indices).
+    As in BCT, the distance of a node to itself is the length of the shortest cycle through it (Inf when none).
+    """
+    cdef int n = D_out.shape[0]
+    cdef int source
+
+    if indices.shape[0] == 0:
+        D_out[:, :] = INFINITY
+        return
+    for source in prange(n, nogil=True, schedule='dynamic'):
+        _breadth(&indptr[0], &indices[0], n, source, &D_out[source, 0])
@@ -29,51 +29,320 @@
 #
 
 import os
+import errno
+import logging
+import hashlib
+import tempfile
+import numpy
 from abc import abstractmethod
-from tvb.adapters.analyzers.matlab_worker import MatlabWorker
+from scipy.sparse import csr_matrix, issparse
+from scipy.sparse.csgraph import shortest_path
 from tvb.basic.filters.chain import FilterChain
 from tvb.basic.profile import TvbProfile
 from tvb.core.adapters.abcadapter import ABCAsynchronous
 from tvb.core.entities.model import AlgorithmTransientGroup
+from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.core.utils import extract_matlab_doc_string
 from tvb.datatypes.connectivity import Connectivity
 from tvb.datatypes.graph import ConnectivityMeasure
 from tvb.datatypes.mapped_values import ValueWrapper
 
+try:
+    # Compiled breadth-first search, built by setup.py when Cython is available
+    from tvb.adapters.analyzers import _bct_bfs
+except ImportError:
+    _bct_bfs = None
+
 
 BCT_GROUP_MODULARITY = AlgorithmTransientGroup("Modularity Algorithms", "Brain Connectivity Toolbox", "bct")
 BCT_GROUP_DISTANCE = AlgorithmTransientGroup("Distance Algorithms", "Brain Connectivity Toolbox", "bctdistance")
 
 BCT_PATH = os.path.join(TvbProfile.current.EXTERNALS_FOLDER_PARENT, "externals/BCT")
 BCT_PATH_ENV = 'BCT_PATH'
+BCT_CACHE_FOLDER = FilesHelper.BCT_CACHE_FOLDER
+# Bytes of MATLAB results kept for each project; the least recently used ones are removed beyond it
+BCT_CACHE_MAX_SIZE = 512 * 2 ** 20
+# Prefix of the files being written to the cache folder
+BCT_CACHE_TEMP_PREFIX = '.'
 if BCT_PATH_ENV in os.environ and os.path.exists(os.environ[BCT_PATH_ENV]) and os.path.isdir(os.environ[BCT_PATH_ENV]):
     BCT_PATH = os.environ[BCT_PATH_ENV]
 
+# Below this number of nodes, a dense Floyd-Warshall is faster than Dijkstra from each node
+FLOYD_WARSHALL_MAX_NODES = 200
+# From this number of nodes, Floyd-Warshall runs on the GPU, when CuPy and a CUDA device are available
+FLOYD_WARSHALL_GPU_MIN_NODES = 2000
+# Above this fraction of non-zero entries, the powers of A in findwalks are multiplied as dense matrices
+FINDWALKS_DENSE_FILL = 0.1
+# Seed of the Leiden random number generator, so that a connectivity always gets the same communities
+LEIDEN_SEED = 0
+
+
+def _module_available(module_name):
+    """
+    Tell if `module_name` can be imported, without importing it (nor running its module level code).
+    """
+    try:
+        from importlib.util import find_spec
+    except ImportError:
+        # Python 2
+        from pkgutil import find_loader as find_spec
+    try:
+        return find_spec(module_name) is not None
+    except ImportError:
+        return False
+
+
+# Kernels compiled ahead-of-time by bct_aot, with the same functions as bct_numba
+AOT_KERNELS_MODULE = "tvb.adapters.analyzers.bct_kernels"
+NUMBA_AVAILABLE = _module_available(AOT_KERNELS_MODULE) or _module_available("numba")
+_numba_kernels_module = None
+# Optional libraries, imported only by the kernels using them
+LEIDEN_AVAILABLE = _module_available("igraph") and _module_available("leidenalg")
+CUPY_AVAILABLE = _module_available("cupy")
+
+
+def numba_kernels():
+    """
+    Module with the Numba kernels: bct_kernels when built by bct_aot, otherwise bct_numba.
+    It is imported on first use only, as importing bct_numba compiles all its kernels.
+    """
+    global _numba_kernels_module
+    if _numba_kernels_module is None:
+        try:
+            from tvb.adapters.analyzers import bct_kernels as kernels_module
+        except ImportError:
+            from tvb.adapters.analyzers import bct_numba as kernels_module
+        _numba_kernels_module = kernels_module
+    return _numba_kernels_module
+
 LABEL_CONNECTIVITY_BINARY = "Binary (directed/undirected) connection matrix"
 LABEL_CONN_WEIGHTED_DIRECTED = "Weighted directed connection matrix"
 LABEL_CONN_WEIGHTED_UNDIRECTED = "Weighted undirected connection matrix"
 
 
+_BCT_DESCRIPTIONS = {}
+
+
 def bct_description(mat_file_name):
-    return extract_matlab_doc_string(os.path.join(BCT_PATH, mat_file_name))
+    """
+    Doc string of a BCT *.m file. Files from BCT_PATH do not change at runtime, thus each is parsed only once.
+    """
+    if mat_file_name not in _BCT_DESCRIPTIONS:
+        _BCT_DESCRIPTIONS[mat_file_name] = extract_matlab_doc_string(os.path.join(BCT_PATH, mat_file_name))
+    return _BCT_DESCRIPTIONS[mat_file_name]
+
+
+def modularity_description(mat_file_name):
+    """
+    Doc string of a BCT modularity function, noting when its native execution uses Leiden instead.
+    """
+    description = bct_description(mat_file_name)
+    if LEIDEN_AVAILABLE:
+        description = ("When MATLAB is not configured, communities are found with the Leiden algorithm "
+                       "(leidenalg) instead of the spectral method below.\n\n" + description)
+    return description
+
+
+def _distance_bin_np(A):
+    """
+    Same result as BCT distance_bin.m, from boolean powers of the adjacency matrix (BLAS matrix products).
+    """
+    binary = (A != 0).astype(A.dtype)
+    n = binary.shape[0]
+    D = numpy.full(binary.shape, numpy.inf, dtype=A.dtype)
+    D[binary > 0] = 1
+    numpy.fill_diagonal(D, 0)
+
+    power = binary
+    for k in range(2, n):
+        power = numpy.matmul(power, binary)
+        numpy.minimum(power, 1, out=power)
+        new = (power > 0) & (D == numpy.inf)
+        if not new.any():
+            break
+        D[new] = k
+    return D
+
+
+def _distance_wei_sp(G):
+    """
+    Same result as BCT distance_wei.m, with SciPy's Dijkstra.
+    As in BCT, G is a connection-length matrix, here in CSR format (stored entries are the connections).
+    """
+    return shortest_path(G, method='D', directed=True)
+
+
+def _floyd_warshall_np(G, xp=numpy):
+    """
+    Same result as BCT distance_wei.m, for a dense connection-length matrix G (zero entries are not connected).
+    Each step relaxes all pairs through node k with a vectorized minimum, instead of branching on every pair.
+    `xp` is the array module owning G: numpy, or cupy for a matrix on the GPU.
+    """
+    D = xp.where(G != 0, G, xp.inf)
+    xp.fill_diagonal(D, 0)
+    for k in range(D.shape[0]):
+        xp.minimum(D, D[:, k, None] + D[k, None, :], out=D)
+    return D
+
+
+def _gpu_available():
+    """
+    Tell if CuPy can be imported and finds a CUDA device.
+    """
+    if not CUPY_AVAILABLE:
+        return False
+    try:
+        import cupy
+    except ImportError:
+        return False
+    return cupy.cuda.is_available()
+
+
+def _floyd_warshall_gpu(G):
+    import cupy
+    return cupy.asnumpy(_floyd_warshall_np(cupy.asarray(G), cupy))
+
+
+def _distance_wei_np(G):
+    """
+    Shortest paths for the dense connection-length matrix G, with the algorithm fitting its size.
+    Only Dijkstra needs G in CSR format, thus it is converted for that case alone.
+    """
+    n = G.shape[0]
+    if n <= FLOYD_WARSHALL_MAX_NODES:
+        return _floyd_warshall_np(G)
+    if n >= FLOYD_WARSHALL_GPU_MIN_NODES and _gpu_available():
+        return _floyd_warshall_gpu(G)
+    return _distance_wei_sp(csr_matrix(G))
+
+
+def _breadthdist_sp(A):
+    """
+    Same result as BCT breadthdist.m, for the CSR matrix A, with SciPy's unweighted (breadth-first) shortest paths
+    from all nodes at once. As in BCT, the distance of a node to itself is the length of the shortest cycle through it.
+    """
+    D = shortest_path(A, method='D', directed=True, unweighted=True)
+    cycles = numpy.full(A.shape[0], numpy.inf)
+    sources, targets = A.nonzero()
+    # a cycle through node t is a path from t to one of its sources s, closed by the connection s -> t
+    numpy.minimum.at(cycles, targets, D[targets, sources] + 1)
+
+    looped = numpy.flatnonzero(A.diagonal())
+    if looped.size:
+        # BCT breadth.m sets the distance of a source with a self-connection to 1 while visiting its neighbours
+        # (in index order). Neighbours after it, and nodes reached first through them, are one step further.
+        shortest = D.copy()
+        for source in looped:
+            neighbours = A.indices[A.indptr[source]:A.indptr[source + 1]]
+            before = neighbours[neighbours < source]
+            through_before = (shortest[before] + 1).min(axis=0) if before.size else numpy.inf
+            D[source] = numpy.where(through_before == shortest[source], shortest[source], shortest[source] + 1)
+    numpy.fill_diagonal(D, cycles)
+    return numpy.isfinite(D).astype(numpy.float64), D
+
+
+def _breadthdist_cy(A):
+    """
+    Same result as BCT breadthdist.m, for the CSR matrix A, with the compiled breadth-first search of _bct_bfs,
+    run in parallel from all source nodes.
+    """
+    if not A.has_sorted_indices:
+        # BCT visits neighbours in index order, which matters for sources with a self-connection
+        A = A.sorted_indices()
+    D = numpy.empty(A.shape, dtype=numpy.float32)
+    _bct_bfs.breadthdist(A.indptr.astype(numpy.intc), A.indices.astype(numpy.intc), D)
+    return numpy.isfinite(D).astype(numpy.float32), D
+
+
+def _findwalks_sp(A, full_walks):
+    """
+    Same result as BCT findwalks.m, for the CSR matrix A. Powers of A are computed one after the other,
+    keeping only the last one (unless `full_walks` asks for the N x N x N matrix), and stopping as soon as
+    no walk of the current length exists. Powers are sparse products until they fill in.
+    """
+    n = A.shape[0]
+    binary = csr_matrix(A != 0, dtype=numpy.float64)
+    if full_walks:
+        Wq = numpy.zeros((n, n, n))
+    else:
+        Wq = numpy.zeros((0, 0, 0))
+    wlq = numpy.zeros(n)
+
+    power = binary
+    for q in range(n):
+        if q > 0:
+            power = power.dot(binary)
+            if issparse(power) and power.nnz > FINDWALKS_DENSE_FILL * n * n:
+                power, binary = power.toarray(), binary.toarray()
+        walks = power.sum()
+        if walks == 0:
+            break
+        wlq[q] = walks
+        if full_walks:
+            Wq[:, :, q] = power.toarray() if issparse(power) else power
+    return Wq, wlq.sum(), wlq
+
+
+def _modularity_leiden(CW, mode):
+    """
+    Community structure and modularity from the Leiden algorithm, run until the partition does not improve.
+    Communities are numbered from 1, as in BCT modularity_dir.m / modularity_und.m.
+    """
+    import igraph
+    import leidenalg
+    graph = igraph.Graph.Weighted_Adjacency(CW.tolist(), mode=mode, attr="weight")
+    partition = leidenalg.find_partition(graph, leidenalg.ModularityVertexPartition,
+                                         weights="weight", n_iterations=-1, seed=LEIDEN_SEED)
+    return numpy.array(partition.membership, dtype=numpy.float64) + 1, partition.modularity
+
+
+def _modularity_dir_leiden(CW):
+    return _modularity_leiden(CW, "directed")
+
+
+def _modularity_und_leiden(CW):
+    return _modularity_leiden(CW, "undirected")
+
+
+# Implementations of BCT functions with NumPy, SciPy or other compiled libraries.
+# These are preferred over the Numba ports in bct_numba.
+NATIVE_KERNELS = {"distance_bin": _distance_bin_np,
+                  "distance_wei": _distance_wei_np,
+                  "breadthdist": _breadthdist_sp if _bct_bfs is None else _breadthdist_cy,
+                  "findwalks": _findwalks_sp}
+if LEIDEN_AVAILABLE:
+    NATIVE_KERNELS["modularity_dir"] = _modularity_dir_leiden
+    NATIVE_KERNELS["modularity_und"] = _modularity_und_leiden
+# Kernels receiving the connectivity weights as a CSR matrix, instead of a dense one
+SPARSE_KERNELS = ("breadthdist", "findwalks")
 
 
 class BaseBCT(ABCAsynchronous):
     """
     Interface between Brain Connectivity Toolbox of Olaf Sporns and TVB Framework.
     This adapter requires BCT deployed locally, and Matlab or Octave installed separately of TVB.
+    Adapters declaring a `_native_kernel` (name of a function in NATIVE_KERNELS or bct_numba) can also run
+    without Matlab.
     """
     _ui_connectivity_label = "Connection matrix:"
+    _native_kernel = None
+    # TVB weights have few significant digits, thus native kernels work in single precision
+    _dtype = numpy.float32
 
 
     def __init__(self):
         ABCAsynchronous.__init__(self)
-        self.matlab_worker = MatlabWorker()
+        # Imported when first needed, as native kernels do not need MATLAB at all
+        self.matlab_worker = None
 
 
-    @staticmethod
-    def can_be_active():
-        return not not TvbProfile.current.MATLAB_EXECUTABLE
+    @classmethod
+    def can_be_active(cls):
+        if TvbProfile.current.MATLAB_EXECUTABLE:
+            return True
+        if cls._native_kernel in NATIVE_KERNELS:
+            return True
+        return cls._native_kernel is not None and NUMBA_AVAILABLE
 
 
     def get_input_tree(self):
@@ -93,40 +362,192 @@ class BaseBCT(ABCAsynchronous):
         return 0
 
 
-    def execute_matlab(self, matlab_code, **kwargs):
+    @staticmethod
+    def _matlab_cache_key(matlab_code, data, unused_results=()):
+        digest = hashlib.sha1((BCT_PATH + os.pathsep + matlab_code).encode('utf-8'))
+        for name in sorted(unused_results):
+            digest.update(('-' + name).encode('utf-8'))
+        for name in sorted(data):
+            value = numpy.ascontiguousarray(data[name])
+            digest.update((name + str(value.dtype) + str(value.shape)).encode('utf-8'))
+            digest.update(value.tobytes())
+        return digest.hexdigest()
+
+
+    def _matlab_cache_file(self, cache_key):
+        cache_folder = os.path.join(self.storage_path, os.pardir, BCT_CACHE_FOLDER)
+        return os.path.join(cache_folder, cache_key + '.npz')
+
+
+    @staticmethod
+    def _matlab_outputs(result, skipped):
+        """
+        Numeric variables computed by MATLAB: without headers, MATLAB objects and the `skipped` variables.
+        """
+        outputs = {}
+        for name, value in result.items():
+            value = numpy.asarray(value)
+            if not name.startswith('__') and name not in skipped and not value.dtype.hasobject:
+                outputs[name] = value
+        return outputs
+
+
+    def _load_matlab_result(self, cache_file):
+        """
+        :returns: the result stored in `cache_file`, or None when it can not be read (the file is then removed,
+                  so that the result computed again can replace it)
+        """
+        if not os.path.exists(cache_file):
+            return None
+        try:
+            stored = numpy.load(cache_file)
+            try:
+                return dict(stored)
+            finally:
+                stored.close()
+        except Exception:
+            self.log.warning("Could not read previous MATLAB result from %s, computing it again.", cache_file)
+            try:
+                os.remove(cache_file)
+            except OSError:
+                pass
+            return None
+
+
+    def _store_matlab_result(self, cache_file, result):
+        """
+        Write `result` in a temporary file next to `cache_file`, then rename it, so that another
+        operation never reads a partially written result.
+        Operations run concurrently, thus another one may create the folder, or store the same result, meanwhile.
+        Failing to keep the result does not fail the operation.
+        """
+        cache_folder = os.path.dirname(cache_file)
+        temp_file = None
+        try:
+            try:
+                os.makedirs(cache_folder)
+            except OSError as excep:
+                if excep.errno != errno.EEXIST:
+                    raise
+            temp_handle, temp_file = tempfile.mkstemp(suffix='.npz', prefix=BCT_CACHE_TEMP_PREFIX, dir=cache_folder)
+            os.close(temp_handle)
+            numpy.savez_compressed(temp_file, **result)
+            # On Windows, this fails when another operation already stored the same result
+            os.rename(temp_file, cache_file)
+            self._trim_matlab_cache(cache_folder)
+        except (IOError, OSError):
+            if temp_file is not None and os.path.exists(temp_file):
+                os.remove(temp_file)
+            if not os.path.exists(cache_file):
+                self.log.warning("Could not keep MATLAB result in %s.", cache_file)
+
+
+    @staticmethod
+    def _trim_matlab_cache(cache_folder):
+        """
+        Remove the least recently used results, until those left in `cache_folder` sum up to BCT_CACHE_MAX_SIZE.
+        Files still being written by other operations are not considered.
+        """
+        cached = []
+        for file_name in os.listdir(cache_folder):
+            if file_name.startswith(BCT_CACHE_TEMP_PREFIX):
+                continue
+            file_path = os.path.join(cache_folder, file_name)
+            try:
+                cached.append((os.path.getmtime(file_path), os.path.getsize(file_path), file_path))
+            except OSError:
+                # removed meanwhile by another operation
+                pass
+        total_size = sum(size for _, size, _ in cached)
+        for _, size, file_path in sorted(cached):
+            if total_size <= BCT_CACHE_MAX_SIZE:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            total_size -= size
+
+
+    def execute_matlab(self, matlab_code, unused_results=(), **kwargs):
+        """
+        Run `matlab_code` with the variables `kwargs`, and return the variables it computed.
+        Results of successful runs are reused for the same code and input, except `unused_results`,
+        which are not kept at all.
+        """
+        # BCT functions are deterministic, thus results of MATLAB are kept under the project folder.
+        # Each operation runs in its own process, thus there is no point in also keeping them in memory.
+        cache_key = self._matlab_cache_key(matlab_code, kwargs, unused_results)
+        cache_file = self._matlab_cache_file(cache_key)
+        result = self._load_matlab_result(cache_file)
+        if result is not None:
+            self.log.info("Loaded previous result of MATLAB code from:" + cache_file)
+            try:
+                # Mark it as recently used, for _trim_matlab_cache
+                os.utime(cache_file, None)
+            except OSError:
+                pass
+            return result
+
+        if self.matlab_worker is None:
+            from tvb.adapters.analyzers.matlab_worker import MatlabWorker
+            self.matlab_worker = MatlabWorker.get_shared()
         self.matlab_worker.add_to_path(BCT_PATH)
         self.log.info("Starting execution of MATLAB code:" + matlab_code)
         runcode, matlablog, result = self.matlab_worker.matlab(matlab_code, kwargs)
-        self.log.debug("Code run in MATLAB: " + str(runcode))
-        self.log.debug("MATLAB log: " + str(matlablog))
-        self.log.debug("Finished MATLAB execution:" + str(result))
+        self.log.debug("Code run in MATLAB: %s", runcode)
+        self.log.debug("MATLAB log: %s", matlablog)
+        if self.log.isEnabledFor(logging.DEBUG):
+            # Avoid building the representation of whole result matrices, when it is not logged
+            self.log.debug("Finished MATLAB execution: %s", result)
+
+        success_flag = 'success' + self.matlab_worker.hex
+        if result.get(success_flag) != 1:
+            self.log.warning("MATLAB code did not complete, its result is not kept:" + matlab_code)
+            return result
+        skipped = set(kwargs) | set(unused_results) | {success_flag, 'hexstamp'}
+        result = self._matlab_outputs(result, skipped)
+        self._store_matlab_result(cache_file, result)
         return result
 
 
+    def prepare_matrix(self, connectivity, sparse=False):
+        """
+        Connectivity weights in the layout used by all native kernels: a C-contiguous dense matrix of `_dtype`,
+        or a CSR matrix (without the zero weights) when `sparse` is set.
+        """
+        weights = numpy.ascontiguousarray(connectivity.weights, dtype=self._dtype)
+        if sparse:
+            return csr_matrix(weights)
+        return weights
+
+
+    def execute_native(self, kernel_name, connectivity, *args):
+        """
+        Run a BCT function in the current process, instead of launching Matlab.
+        Extra `args` are passed to the kernel after the connectivity matrix.
+        """
+        self.log.info("Starting native execution of BCT function:" + kernel_name)
+        if kernel_name in NATIVE_KERNELS:
+            kernel = NATIVE_KERNELS[kernel_name]
+        else:
+            kernel = getattr(numba_kernels(), kernel_name)
+        return kernel(self.prepare_matrix(connectivity, kernel_name in SPARSE_KERNELS), *args)
+
+
     def build_connectivity_measure(self, result, key, connectivity, title="", label_x="", label_y=""):
-        measure = ConnectivityMeasure(storage_path=self.storage_path)
-        measure.array_data = result[key]
-        measure.connectivity = connectivity
-        measure.title = title
-        measure.label_x = label_x
-        measure.label_y = label_y
-        return measure
+        return ConnectivityMeasure(storage_path=self.storage_path, array_data=result[key], connectivity=connectivity,
+                                   title=title, label_x=label_x, label_y=label_y)
 
 
     def build_float_value_wrapper(self, result, key, title=""):
-        value = ValueWrapper(storage_path=self.storage_path)
-        value.data_value = float(result[key])
-        value.data_type = 'float'
-        value.data_name = title
-        return value
+        return ValueWrapper(storage_path=self.storage_path, data_value=float(result[key]),
+                            data_type='float', data_name=title)
 
 
     def build_int_value_wrapper(self, result, key, title=""):
-        value = ValueWrapper(storage_path=self.storage_path)
-        value.data_value = int(result[key])
-        value.data_type = 'int'
-        value.data_name = title
-        return value
+        return ValueWrapper(storage_path=self.storage_path, data_value=int(result[key]),
+                            data_type='int', data_name=title)
 
 
     @abstractmethod
@@ -157,15 +578,20 @@ class ModularityOCSM(BaseBCT):
     _ui_connectivity_label = "Directed (weighted or binary) connection matrix:"
 
     _ui_name = "Optimal Community Structure and Modularity"
-    _ui_description = bct_description("modularity_dir.m")
+    _ui_description = modularity_description("modularity_dir.m")
     _matlab_code = "[Ci,Q] = modularity_dir(CW);"
+    _native_kernel = "modularity_dir"
 
 
     def launch(self, connectivity, **kwargs):
-        # Prepare parameters
-        kwargs['CW'] = connectivity.weights
-        # Execute the matlab code
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        if TvbProfile.current.MATLAB_EXECUTABLE:
+            # Prepare parameters
+            kwargs['CW'] = connectivity.weights
+            # Execute the matlab code
+            result = self.execute_matlab(self._matlab_code, **kwargs)
+        else:
+            ci, q = self.execute_native(self._native_kernel, connectivity)
+            result = {'Ci': ci, 'Q': q}
         # Gather results
         measure = self.build_connectivity_measure(result, 'Ci', connectivity, "Optimal Community Structure")
         value = self.build_float_value_wrapper(result, 'Q', title="Maximized Modularity")
@@ -176,8 +602,9 @@ class ModularityOpCSMU(ModularityOCSM):
     """
     """
     _ui_name = "Optimal Community Structure and Modularity (Undirected)"
-    _ui_description = bct_description("modularity_und.m")
+    _ui_description = modularity_description("modularity_und.m")
     _matlab_code = "[Ci,Q] = modularity_und(CW);"
+    _native_kernel = "modularity_und"
 
 
 class DistanceDBIN(BaseBCT):
@@ -188,11 +615,15 @@ class DistanceDBIN(BaseBCT):
     _ui_name = "Distance binary matrix"
     _ui_description = bct_description("distance_bin.m")
     _matlab_code = "D = distance_bin(A);"
+    _native_kernel = "distance_bin"
 
 
     def launch(self, connectivity, **kwargs):
-        kwargs['A'] = connectivity.weights
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        if TvbProfile.current.MATLAB_EXECUTABLE:
+            kwargs['A'] = connectivity.weights
+            result = self.execute_matlab(self._matlab_code, **kwargs)
+        else:
+            result = {'D': self.execute_native(self._native_kernel, connectivity)}
         measure = self.build_connectivity_measure(result, 'D', connectivity, "Distance matrix")
         return [measure]
 
@@ -204,6 +635,7 @@ class DistanceDWEI(DistanceDBIN):
     _ui_name = "Distance weighted matrix"
     _ui_description = bct_description("distance_wei.m")
     _matlab_code = "D = distance_wei(A);"
+    _native_kernel = "distance_wei"
 
 
 class DistanceRDM(DistanceDBIN):
@@ -212,11 +644,16 @@ class DistanceRDM(DistanceDBIN):
     _ui_name = "Reachability and distance matrices (Breadth-first search)"
     _ui_description = bct_description("breadthdist.m")
     _matlab_code = "[R,D] = breadthdist(A);"
+    _native_kernel = "breadthdist"
 
 
     def launch(self, connectivity, **kwargs):
-        kwargs['A'] = connectivity.weights
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        if TvbProfile.current.MATLAB_EXECUTABLE:
+            kwargs['A'] = connectivity.weights
+            result = self.execute_matlab(self._matlab_code, **kwargs)
+        else:
+            r, d = self.execute_native(self._native_kernel, connectivity)
+            result = {'R': r, 'D': d}
 
         measure1 = self.build_connectivity_measure(result, 'R', connectivity, "Reachability matrix")
         measure2 = self.build_connectivity_measure(result, 'D', connectivity, "Distance matrix")
@@ -229,6 +666,7 @@ class DistanceRDA(DistanceRDM):
     _ui_name = "Reachability and distance matrices (Algebraic path count)"
     _ui_description = bct_description("reachdist.m")
     _matlab_code = "[R,D] = reachdist(A);"
+    _native_kernel = "reachdist"
 
 
 class DistanceNETW(DistanceDBIN):
@@ -237,13 +675,28 @@ class DistanceNETW(DistanceDBIN):
     _ui_name = "Network walks"
     _ui_description = bct_description("findwalks.m")
     _matlab_code = "[Wq,twalk,wlq]  = findwalks(A);"
+    _native_kernel = "findwalks"
 
 
-    def launch(self, connectivity, **kwargs):
-        kwargs['A'] = connectivity.weights
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+    def get_input_tree(self):
+        tree = DistanceDBIN.get_input_tree(self)
+        tree.append({'name': 'full_walks', 'type': 'bool', 'default': False,
+                     'label': 'Also store the walks of each length between all nodes (N x N x N matrix)'})
+        return tree
+
+
+    def launch(self, connectivity, full_walks=False, **kwargs):
+        if TvbProfile.current.MATLAB_EXECUTABLE:
+            kwargs['A'] = connectivity.weights
+            unused_results = () if full_walks else ('Wq',)
+            result = self.execute_matlab(self._matlab_code, unused_results, **kwargs)
+        else:
+            wq, twalk, wlq = self.execute_native(self._native_kernel, connectivity, full_walks)
+            result = {'Wq': wq, 'twalk': twalk, 'wlq': wlq}
 
-        measure1 = self.build_connectivity_measure(result, 'Wq', connectivity, "3D matrix")
         measure2 = self.build_connectivity_measure(result, 'wlq', connectivity, "Walk length distribution")
         value = self.build_float_value_wrapper(result, 'twalk', title="Total number of walks found")
+        if not full_walks:
+            return [value, measure2]
+        measure1 = self.build_connectivity_measure(result, 'Wq', connectivity, "3D matrix")
         return [measure1, value, measure2]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Ahead-of-time compilation of the Numba BCT kernels from bct_numba, into the `bct_kernels` extension module.
+
+Run once, after installing TVB with Numba:
+
+    python -m tvb.adapters.analyzers.bct_aot
+
+When `bct_kernels` is found, the BCT adapters use it and neither import Numba nor JIT-compile at runtime.
+"""
+
+import os
+from numba.pycc import CC
+from tvb.adapters.analyzers import bct_numba
+
+
+AOT_MODULE_NAME = "bct_kernels"
+
+KERNEL_SIGNATURES = {"modularity_dir": "Tuple((float64[::1], float64))(float32[:, ::1])",
+                     "modularity_und": "Tuple((float64[::1], float64))(float32[:, ::1])",
+                     "reachdist": "UniTuple(float32[:, ::1], 2)(float32[:, ::1])"}
+
+
+def build(output_dir=None):
+    """
+    Compile all kernels from KERNEL_SIGNATURES in a shared library placed next to bct_numba (by default).
+    """
+    compiler = CC(AOT_MODULE_NAME)
+    compiler.output_dir = output_dir or os.path.dirname(os.path.abspath(bct_numba.__file__))
+    for name, signature in KERNEL_SIGNATURES.items():
+        compiler.export(name, signature)(getattr(bct_numba, name).py_func)
+    compiler.compile()
+    return compiler.output_dir
+
+
+if __name__ == '__main__':
+    print("BCT kernels compiled in " + build())
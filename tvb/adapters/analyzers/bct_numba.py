@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Numba ports of the Brain Connectivity Toolbox functions used by the BCT adapters.
+
+They are used instead of launching MATLAB/Octave when no such executable is configured in TVB, for the
+functions without an implementation in bct_adapters.NATIVE_KERNELS.
+Each kernel mirrors the corresponding BCT *.m file, including the conventions for the returned values
+(1-based community indices, Inf for unreachable nodes).
+Kernels receive float32 matrices; modularity is still accumulated in float64.
+"""
+
+import numpy
+from numba import njit, prange
+
+
+@njit("float32[:, ::1](float32[:, ::1])", cache=True)
+def _binarize(A):
+    """
+    Equivalent of MATLAB single(A~=0)
+    """
+    n = A.shape[0]
+    B = numpy.zeros((n, n), numpy.float32)
+    for i in range(n):
+        for j in range(n):
+            if A[i, j] != 0:
+                B[i, j] = 1.0
+    return B
+
+
+@njit("float64[::1](float64[:, ::1])", cache=True)
+def _newman_partition(B):
+    """
+    Spectral community detection on a symmetric modularity matrix B (Newman 2006, Leicht & Newman 2008),
+    with the fine-tuning step from BCT. Returns the 1-based community index of each node.
+    """
+    N = B.shape[0]
+    Ci = numpy.ones(N)
+    cn = 1
+    U = [1, 0]
+    ind = numpy.arange(N)
+    Bg = B.copy()
+
+    while U[0] != 0:
+        Ng = ind.shape[0]
+        eigen_values, eigen_vectors = numpy.linalg.eigh(Bg)
+        v1 = eigen_vectors[:, numpy.argmax(eigen_values)]
+        S = numpy.ones(Ng)
+        S[v1 < 0] = -1.0
+        q = numpy.dot(S, numpy.dot(Bg, S))
+
+        if q > 1e-10:
+            # Fine tuning: flip the node giving the highest modularity gain, until all nodes were flipped once
+            qmax = q
+            for i in range(Ng):
+                Bg[i, i] = 0.0
+            flippable = numpy.ones(Ng, dtype=numpy.bool_)
+            Sit = S.copy()
+            for _ in range(Ng):
+                Qit = qmax - 4 * Sit * numpy.dot(Bg, Sit)
+                imax = -1
+                for i in range(Ng):
+                    if flippable[i] and (imax < 0 or Qit[i] > Qit[imax]):
+                        imax = i
+                qmax = Qit[imax]
+                Sit[imax] = -Sit[imax]
+                flippable[imax] = False
+                if qmax > q:
+                    q = qmax
+                    S = Sit.copy()
+
+            if abs(S.sum()) == Ng:
+                U.pop(0)
+            else:
+                cn += 1
+                Ci[ind[S == 1]] = U[0]
+                Ci[ind[S == -1]] = cn
+                U.insert(0, cn)
+        else:
+            U.pop(0)
+
+        ind = numpy.nonzero(Ci == U[0])[0]
+        bg = B[ind, :][:, ind]
+        Bg = bg - numpy.diag(bg.sum(axis=0))
+
+    return Ci
+
+
+@njit("float64(float64[::1], float64[:, ::1])", cache=True)
+def _intra_community_sum(Ci, B):
+    total = 0.0
+    n = Ci.shape[0]
+    for i in range(n):
+        for j in range(n):
+            if Ci[i] == Ci[j]:
+                total += B[i, j]
+    return total
+
+
+@njit("Tuple((float64[::1], float64))(float32[:, ::1])", cache=True)
+def modularity_dir(CW):
+    """
+    Port of BCT modularity_dir.m: optimal community structure and modularity of a directed graph.
+    """
+    W = CW.astype(numpy.float64)
+    Ki = W.sum(axis=0)
+    Ko = W.sum(axis=1)
+    m = Ki.sum()
+    b = W - numpy.outer(Ko, Ki) / m
+    B = b + b.T
+    Ci = _newman_partition(B)
+    return Ci, _intra_community_sum(Ci, B) / (2 * m)
+
+
+@njit("Tuple((float64[::1], float64))(float32[:, ::1])", cache=True)
+def modularity_und(CW):
+    """
+    Port of BCT modularity_und.m: optimal community structure and modularity of an undirected graph.
+    """
+    W = CW.astype(numpy.float64)
+    K = W.sum(axis=0)
+    m = K.sum()
+    B = W - numpy.outer(K, K) / m
+    Ci = _newman_partition(B)
+    return Ci, _intra_community_sum(Ci, B) / m
+
+
+@njit("void(float32[:, ::1], int64, float32[::1], float32[::1])", cache=True)
+def _reach_single(B, source, reach, distance):
+    """
+    Row `source` of reachdist, from the powers of the binary matrix B applied to that row only.
+    """
+    n = B.shape[0]
+    reach[:] = 0.0
+    distance[:] = numpy.inf
+    path = B[source].copy()
+    next_path = numpy.empty(n, numpy.float32)
+    for power in range(1, n + 1):
+        found = False
+        for j in range(n):
+            if path[j] != 0 and reach[j] == 0:
+                reach[j] = 1.0
+                distance[j] = power
+                found = True
+        if not found:
+            # Nothing new became reachable, so no higher power will find anything else
+            break
+        next_path[:] = 0.0
+        for i in range(n):
+            if path[i] != 0:
+                for j in range(n):
+                    if B[i, j] != 0:
+                        next_path[j] = 1.0
+        path, next_path = next_path, path
+
+
+@njit("UniTuple(float32[:, ::1], 2)(float32[:, ::1])", parallel=True, cache=True)
+def reachdist(A):
+    """
+    Port of BCT reachdist.m: reachability and distance matrices, computed from the powers of the
+    binary adjacency matrix. The distance from a node to itself is the length of the shortest cycle through it.
+    Source nodes are processed in parallel threads.
+    """
+    n = A.shape[0]
+    B = _binarize(A)
+    R = numpy.empty((n, n), numpy.float32)
+    D = numpy.empty((n, n), numpy.float32)
+    for source in prange(n):
+        _reach_single(B, source, R[source], D[source])
+    return R, D
+
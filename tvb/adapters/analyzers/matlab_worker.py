@@ -58,10 +58,29 @@ class MatlabWorker(object):
     """
 
     matlab_paths = []
+    _shared_instance = None
+
+
+    @classmethod
+    def get_shared(cls):
+        """
+        :returns: a worker instance reused by all callers in the current process
+        """
+        if cls._shared_instance is None:
+            cls._shared_instance = cls()
+        return cls._shared_instance
 
 
     def __init__(self):
         self.mlab_exe = TvbProfile.current.MATLAB_EXECUTABLE
+        self._new_file_names()
+
+
+    def _new_file_names(self):
+        """
+        Pick a new hex stamp, and the names of the files exchanged with MATLAB from it.
+        Called for each execution, so that files left by a previous one are never read again.
+        """
         self.hex = hex(random.randint(0, 2 ** 32))
         self.script_name = "script%s" % self.hex
         self.script_fname = self.script_name + '.m'
@@ -114,9 +133,11 @@ class MatlabWorker(object):
     def add_to_path(self, path_to_add):
         """
         Add a path to the list of paths that will be added to the path
-        in the MATLAB session
+        in the MATLAB session. Paths already in the list are not added again,
+        so that each addpath is executed only once per script.
         """
-        self.matlab_paths.append(path_to_add)
+        if path_to_add not in self.matlab_paths:
+            self.matlab_paths.append(path_to_add)
 
 
     def matlab(self, code, data=None, work_dir=None, cleanup=True):
@@ -138,6 +159,9 @@ class MatlabWorker(object):
         os.chdir(wdir)
         os.chdir(work_dir or os.getcwd())
 
+        self._new_file_names()
+        while os.path.exists(self.done_fname):
+            self._new_file_names()
         pre, post = self._matlab_pre(), self._matlab_post()
         code = ("\nsuccess%s = 0\n" + code + "\nsuccess%s = 1\n") % (self.hex, self.hex)
 
@@ -257,7 +257,8 @@ class ExportManager:
 
         else:
             to_be_exported_folders.append({'folder': project_folder,
-                                           'archive_path_prefix': '', 'exclude': ["TEMP"]})
+                                           'archive_path_prefix': '',
+                                           'exclude': ["TEMP", files_helper.BCT_CACHE_FOLDER]})
 
         # Compute path and name of the zip file
         now = datetime.now()
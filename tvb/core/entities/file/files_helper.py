@@ -57,6 +57,8 @@ class FilesHelper():
     IMAGES_FOLDER = "IMAGES"
     PROJECTS_FOLDER = "PROJECTS"
     ALLEN_MOUSE_CONNECTIVITY_CACHE_FOLDER = "ALLEN_MOUSE_CONNECTIVITY_CACHE"
+    # Results of BCT analyzers run with MATLAB, reused by later operations of the same project
+    BCT_CACHE_FOLDER = "BCT_CACHE"
 
     TVB_FILE_EXTENSION = XMLWriter.FILE_EXTENSION    
     TVB_STORAGE_FILE_EXTENSION = ".h5"
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+import os
+import shutil
+import tempfile
+import numpy
+import pytest
+from scipy.sparse import csr_matrix
+from tvb.tests.framework.core.base_testcase import BaseTestCase, TransactionalTestCase
+from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.datatypes.graph import ConnectivityMeasure
+from tvb.datatypes.mapped_values import ValueWrapper
+from tvb.adapters.analyzers import bct_adapters
+
+# Undirected path 0 - 1 - 2
+PATH = numpy.array([[0., 1., 0.],
+                    [1., 0., 1.],
+                    [0., 1., 0.]])
+# Connection lengths, where the shortest path from 0 to 2 goes through 1
+LENGTHS = numpy.array([[0., 1., 5.],
+                       [1., 0., 2.],
+                       [5., 2., 0.]])
+# Two disconnected triangles
+TRIANGLES = numpy.kron(numpy.eye(2), numpy.ones((3, 3)) - numpy.eye(3))
+
+
+class TestBCTNumpy(BaseTestCase):
+    """
+    Check the NumPy/SciPy/Leiden implementations of BCT functions against results known for small graphs.
+    """
+
+
+    def test_distance_bin(self):
+        expected = numpy.array([[0., 1., 2.],
+                                [1., 0., 1.],
+                                [2., 1., 0.]])
+        assert numpy.array_equal(bct_adapters._distance_bin_np(PATH * 7), expected)
+
+
+    def test_distance_wei(self):
+        distances = bct_adapters._distance_wei_sp(csr_matrix(LENGTHS))
+        assert distances[0, 2] == 3.
+        assert numpy.array_equal(distances, distances.T)
+        assert not numpy.diag(distances).any()
+        # adapters pass the dense matrix
+        assert numpy.array_equal(bct_adapters._distance_wei_np(LENGTHS), distances)
+
+
+    def test_floyd_warshall(self):
+        expected = bct_adapters._distance_wei_sp(csr_matrix(LENGTHS))
+        assert numpy.array_equal(bct_adapters._floyd_warshall_np(LENGTHS), expected)
+
+
+    @pytest.mark.skipif(not bct_adapters._gpu_available(), reason="CuPy or CUDA device not available!")
+    def test_floyd_warshall_gpu(self):
+        expected = bct_adapters._distance_wei_sp(csr_matrix(LENGTHS))
+        assert numpy.array_equal(bct_adapters._floyd_warshall_gpu(LENGTHS), expected)
+
+
+    def test_breadthdist(self):
+        disconnected = numpy.zeros((4, 4))
+        disconnected[:3, :3] = PATH
+        kernels = [bct_adapters._breadthdist_sp]
+        if bct_adapters._bct_bfs is not None:
+            kernels.append(bct_adapters._breadthdist_cy)
+        for kernel in kernels:
+            reach, distances = kernel(csr_matrix(disconnected))
+            assert numpy.array_equal(reach[:3, :3], numpy.ones((3, 3)))
+            assert not reach[3].any() and not reach[:, 3].any()
+            assert numpy.array_equal(numpy.diag(distances)[:3], [2., 2., 2.])
+            assert distances[0, 2] == 2. and distances[0, 3] == numpy.inf
+
+            # as in BCT, a source with a self-connection is at distance 1 when its later neighbours are visited
+            looped = PATH.copy()
+            looped[0, 0] = 1.
+            reach, distances = kernel(csr_matrix(looped))
+            assert numpy.array_equal(numpy.diag(distances), [1., 2., 2.])
+            assert numpy.array_equal(distances[0], [1., 2., 3.])
+            assert reach.all()
+            looped = PATH.copy()
+            looped[1, 1] = 1.
+            reach, distances = kernel(csr_matrix(looped))
+            assert numpy.array_equal(distances[1], [1., 1., 2.])
+            assert numpy.array_equal(distances[0], [2., 1., 2.])
+
+
+    def test_findwalks(self):
+        wq, twalk, wlq = bct_adapters._findwalks_sp(csr_matrix(PATH), True)
+        assert numpy.array_equal(wq.sum(axis=(0, 1)), wlq)
+        assert numpy.array_equal(wlq, [4., 6., 8.])
+        assert twalk == 18.
+
+        acyclic = numpy.triu(numpy.ones((4, 4)), 1)
+        wq, twalk, wlq = bct_adapters._findwalks_sp(csr_matrix(acyclic), False)
+        assert wq.size == 0
+        assert numpy.array_equal(wlq, [6., 4., 1., 0.])
+        assert twalk == 11.
+
+
+    @pytest.mark.skipif(not bct_adapters.LEIDEN_AVAILABLE, reason="leidenalg not installed!")
+    def test_modularity_leiden(self):
+        for kernel in [bct_adapters._modularity_dir_leiden, bct_adapters._modularity_und_leiden]:
+            ci, q = kernel(TRIANGLES)
+            assert len(set(ci[:3])) == 1 and len(set(ci[3:])) == 1
+            assert ci[0] != ci[3] and ci.min() == 1
+            assert abs(q - 0.5) < 1e-10
+            # seeded, thus repeatable
+            assert numpy.array_equal(kernel(TRIANGLES)[0], ci)
+
+
+@pytest.mark.skipif(not bct_adapters.NUMBA_AVAILABLE, reason="Numba not installed!")
+class TestBCTNumba(BaseTestCase):
+    """
+    Check the Numba ports of BCT functions against results known for small graphs.
+    """
+
+
+    def setup_method(self):
+        self.kernels = bct_adapters.numba_kernels()
+
+
+    def test_modularity_und(self):
+        ci, q = self.kernels.modularity_und(TRIANGLES.astype(numpy.float32))
+        assert len(set(ci[:3])) == 1 and len(set(ci[3:])) == 1
+        assert ci[0] != ci[3]
+        assert abs(q - 0.5) < 1e-10
+
+
+    def test_modularity_dir(self):
+        ci, q = self.kernels.modularity_dir(TRIANGLES.astype(numpy.float32))
+        assert ci[0] != ci[3]
+        assert abs(q - 0.5) < 1e-10
+
+
+    def test_reachdist(self):
+        disconnected = numpy.zeros((4, 4))
+        disconnected[:3, :3] = PATH
+        reach, distances = self.kernels.reachdist(disconnected.astype(numpy.float32))
+        assert numpy.array_equal(reach[:3, :3], numpy.ones((3, 3)))
+        assert not reach[3].any() and not reach[:, 3].any()
+        assert numpy.array_equal(numpy.diag(distances)[:3], [2., 2., 2.])
+        assert distances[0, 2] == 2. and distances[0, 3] == numpy.inf
+
+
+
+class _FakeMatlabWorker(object):
+    """
+    Stand-in for MatlabWorker, returning a workspace like the one loaded by scipy.io.loadmat.
+    """
+
+
+    def __init__(self, success=1):
+        self.hex = '0x1a2b'
+        self.success = success
+        self.executions = 0
+
+
+    def add_to_path(self, path_to_add):
+        pass
+
+
+    def matlab(self, code, data=None):
+        self.executions += 1
+        workspace = dict(data)
+        workspace.update({'__header__': b'MATLAB 5.0 MAT-file', 'hexstamp': self.hex,
+                          'success' + self.hex: self.success, 'D': data['A'] * 2, 'Wq': data['A'] * 3})
+        return code, "", workspace
+
+
+class TestBCTMatlabCache(BaseTestCase):
+    """
+    Check when BaseBCT.execute_matlab reuses results of previous MATLAB executions.
+    """
+    CODE = "[Wq,D] = fake(A);"
+
+
+    def setup_method(self):
+        self.storage = tempfile.mkdtemp()
+        self.adapter = bct_adapters.DistanceDBIN()
+        self.adapter.storage_path = os.path.join(self.storage, "operation")
+        self.adapter.matlab_worker = _FakeMatlabWorker()
+        self.cache_max_size = bct_adapters.BCT_CACHE_MAX_SIZE
+
+
+    def teardown_method(self):
+        bct_adapters.BCT_CACHE_MAX_SIZE = self.cache_max_size
+        shutil.rmtree(self.storage)
+
+
+    def _cache_file(self, unused_results=()):
+        return self.adapter._matlab_cache_file(self.adapter._matlab_cache_key(self.CODE, {'A': PATH}, unused_results))
+
+
+    def test_result_reused(self):
+        result = self.adapter.execute_matlab(self.CODE, A=PATH)
+        assert sorted(result) == ['D', 'Wq']
+        assert numpy.array_equal(result['D'], PATH * 2)
+        assert self.adapter.matlab_worker.executions == 1
+
+        result = self.adapter.execute_matlab(self.CODE, A=PATH)
+        assert sorted(result) == ['D', 'Wq']
+        assert numpy.array_equal(result['Wq'], PATH * 3)
+        assert self.adapter.matlab_worker.executions == 1
+
+        self.adapter.execute_matlab(self.CODE, A=PATH * 5)
+        assert self.adapter.matlab_worker.executions == 2
+
+
+    def test_unused_results_not_kept(self):
+        result = self.adapter.execute_matlab(self.CODE, ('Wq',), A=PATH)
+        assert sorted(result) == ['D']
+        assert sorted(self.adapter.execute_matlab(self.CODE, ('Wq',), A=PATH)) == ['D']
+        assert self.adapter.matlab_worker.executions == 1
+
+        result = self.adapter.execute_matlab(self.CODE, A=PATH)
+        assert numpy.array_equal(result['Wq'], PATH * 3)
+        assert self.adapter.matlab_worker.executions == 2
+
+
+    def test_failed_execution_not_kept(self):
+        self.adapter.matlab_worker = _FakeMatlabWorker(success=0)
+        self.adapter.execute_matlab(self.CODE, A=PATH)
+        self.adapter.execute_matlab(self.CODE, A=PATH)
+        assert self.adapter.matlab_worker.executions == 2
+        assert not os.path.exists(self._cache_file())
+
+
+    def test_unreadable_cache_file(self):
+        cache_file = self._cache_file()
+        os.makedirs(os.path.dirname(cache_file))
+        with open(cache_file, 'w') as file_data:
+            file_data.write("not an npz archive")
+
+        result = self.adapter.execute_matlab(self.CODE, A=PATH)
+        assert numpy.array_equal(result['D'], PATH * 2)
+        assert self.adapter.matlab_worker.executions == 1
+        assert os.listdir(os.path.dirname(cache_file)) == [os.path.basename(cache_file)]
+
+        self.adapter.execute_matlab(self.CODE, A=PATH)
+        assert self.adapter.matlab_worker.executions == 1
+
+
+    def test_result_not_storable(self):
+        # a file where the cache folder should be
+        with open(os.path.normpath(os.path.dirname(self._cache_file())), 'w') as file_data:
+            file_data.write("not a folder")
+
+        result = self.adapter.execute_matlab(self.CODE, A=PATH)
+        assert numpy.array_equal(result['D'], PATH * 2)
+
+
+    def test_least_recently_used_removed(self):
+        self.adapter.execute_matlab(self.CODE, A=PATH)
+        first_file = self._cache_file()
+        # room for one result only
+        bct_adapters.BCT_CACHE_MAX_SIZE = os.path.getsize(first_file) * 3 // 2
+        os.utime(first_file, (0, 0))
+
+        self.adapter.execute_matlab(self.CODE, A=PATH * 5)
+        assert not os.path.exists(first_file)
+        assert len(os.listdir(os.path.dirname(first_file))) == 1
+
+
+
+class TestBCTNativeLaunch(TransactionalTestCase):
+    """
+    Launch BCT adapters with their native kernels (MATLAB not configured), on a stored connectivity.
+    """
+
+
+    def transactional_setup_method(self):
+        self.matlab_executable = TvbProfile.current.MATLAB_EXECUTABLE
+        TvbProfile.current.MATLAB_EXECUTABLE = None
+        factory = DatatypesFactory()
+        # 4 nodes, all connected (self-connections included): wlq = [4^2, 4^3, 4^4, 4^5]
+        _, self.connectivity = factory.create_connectivity(4)
+        self.storage_path = FilesHelper().get_project_folder(factory.project, "bct_native")
+
+
+    def transactional_teardown_method(self):
+        TvbProfile.current.MATLAB_EXECUTABLE = self.matlab_executable
+        self.clean_database(True)
+
+
+    def _launch_findwalks(self, full_walks):
+        adapter = bct_adapters.DistanceNETW()
+        adapter.storage_path = self.storage_path
+        return adapter.launch(self.connectivity, full_walks=full_walks)
+
+
+    def test_findwalks(self):
+        value, measure = self._launch_findwalks(False)
+        assert isinstance(value, ValueWrapper) and isinstance(measure, ConnectivityMeasure)
+        assert value.data_value == 1360.
+        assert numpy.array_equal(measure.array_data, [16., 64., 256., 1024.])
+        assert measure.connectivity is self.connectivity
+
+
+    def test_findwalks_full(self):
+        walks, value, measure = self._launch_findwalks(True)
+        assert isinstance(walks, ConnectivityMeasure)
+        assert walks.array_data.shape == (4, 4, 4)
+        assert numpy.array_equal(walks.array_data.sum(axis=(0, 1)), measure.array_data)
+        assert value.data_value == 1360.